@@ -1,8 +1,9 @@
+import time
+_LAUNCH_TIME = time.perf_counter()
+
 import threading
-import psutil
-import subprocess
+import importlib
 import logging
-import time
 import os
 import signal
 import sys
@@ -11,17 +12,38 @@ import random
 import shlex
 import hashlib
 import json
-import numpy as np
 from queue import Queue
-from collections import defaultdict, deque, OrderedDict
-from typing import Dict, List, Any, Tuple
-import pickle
+from collections import defaultdict, deque, OrderedDict, Counter
+from typing import Dict, List, Any, Tuple, Mapping, NamedTuple, Callable, Optional, Iterator
+from types import MappingProxyType
 import socket
+import errno
+import select
+import stat
+import struct
+
+class _LazyModule:
+    """Imports the named module on first attribute access, keeping startup cheap."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+psutil = _LazyModule('psutil')
+np = _LazyModule('numpy')
+subprocess = _LazyModule('subprocess')
 
 # Configuration
 FRAMEWORK_DIR = '/home/gm48/ghostmesh'  # Update to your actual framework directory
 ALLOWED_PORTS = [8080]
 ALLOWED_OUTGOING = ['192.168.0.1']
+RESOLV_CONF = '/etc/resolv.conf'  # Nameservers allowed on port 53 while ALLOWED_OUTGOING is resolved
 ESSENTIAL_PROCESSES = ['sshd', 'systemd', 'bash', 'cron', 'init']
 WHITELISTED_PROCESSES = ['python3']
 LOG_FILES = ['./agi_firewall.log']  # Update to your actual log file paths
@@ -90,6 +112,8 @@ SEVERITY = {
     "deceptive_behavior": 8,
     "memory_anomaly": 3,
     "oracle_violation": 6,
+    "egress_violation": 6,
+    "critical_detector_failure": 8,
 }
 DECAY_FACTOR_PER_MIN = 0.95  # ≈5% every minute
 
@@ -122,6 +146,85 @@ AGI_MODULES = [
     'DivinePhysicsEngine', 'MultiverseSimulator', 'GhostShell'
 ]
 
+# Kernel drop-log accounting
+DROP_LOG_SOURCE = '/dev/kmsg'  # Point at a plain log file to replay captured drop records
+DROP_LOG_PREFIX = 'AGI-FIREWALL-DROP-'
+DROP_ACCOUNTING_INTERVAL = 5  # Seconds between socket-table refreshes / anomaly evaluation
+EGRESS_DROP_THRESHOLD = 50  # Blocked egress attempts per interval before an AGI module is flagged
+
+# Process scanning
+PROCESS_SCAN_ATTRS = ['pid', 'ppid', 'name', 'exe', 'cmdline', 'cpu_percent', 'memory_info']
+PROCESS_SCAN_INTERVAL = 2  # Seconds between AGI process samples
+RECONCILE_SCAN_INTERVAL = 30  # Full process-table pass when proc connector events are flowing
+PROC_EVENT_WATCHDOG = 10  # Seconds without connector events before falling back to polling
+EXEC_AGGREGATION_WINDOW = 30  # Seconds over which repeated unauthorized execs of one command score once
+CPU_PRIME_INTERVAL = 0.1  # Gap between the startup pass and the first cpu_percent-bearing scan
+
+# Startup stages that together make up full protection
+STARTUP_STAGES = ('first_scan', 'primed_scan', 'ruleset')
+STAGE_FAILED = 'failed'  # Recorded in place of a timing until the stage succeeds
+
+# Detector scheduling
+DETECTOR_TICK_BUDGET = 0.2  # Seconds of detector time allowed per input kind per tick
+MAX_DETECTOR_STRIDE = 16  # Non-critical detectors are sampled down to at most 1 tick in N
+SAFETY_TICK_INTERVAL = 10  # Seconds per oracle/snapshot tick; detector `every` counts these ticks
+
+# Linux netlink proc connector (see linux/cn_proc.h, linux/connector.h)
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_EVENT_NONE = 0x00000000  # Subscription ack, carries an errno
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+NLMSG_DONE = 3
+_NLMSG_HDR = struct.Struct('=IHHII')
+_CN_MSG_HDR = struct.Struct('=IIIIHH')
+_PROC_EVENT_HDR = struct.Struct('=IIQ')
+
+_EMPTY_MAPPING = MappingProxyType({})
+
+class SnapshotState:
+    """Copy-on-write cell: writers publish immutable values, readers never lock.
+
+    Rebinding ``self._current`` is atomic under the GIL, so ``snapshot()`` is a
+    plain attribute read.  Writers serialise among themselves only; the
+    ``write_contention`` counter records how often a writer had to wait.
+    """
+
+    def __init__(self, initial):
+        self._current = initial
+        self._write_lock = threading.Lock()
+        self.epoch = 0
+        self.publishes = 0
+        self.write_contention = 0
+
+    def snapshot(self):
+        return self._current
+
+    def update(self, fn: Callable[[Any], Any]):
+        """Derives a new value from the current one and publishes it atomically."""
+        contended = not self._write_lock.acquire(blocking=False)
+        if contended:
+            self._write_lock.acquire()
+        try:
+            if contended:
+                self.write_contention += 1  # Counted under the lock so the figure itself is exact
+            new_value = fn(self._current)
+            self.epoch += 1
+            self.publishes += 1
+            self._current = new_value
+            return new_value
+        finally:
+            self._write_lock.release()
+
+class ScanSnapshot(NamedTuple):
+    """Immutable view of scanner state, published once per monitoring tick."""
+    epoch: int
+    timestamp: float
+    behavioral_history: Mapping[str, Tuple[Dict, ...]]
+
 class CapabilityMonitor:
     """Monitors for dangerous capability emergence in AGI systems."""
     
@@ -137,7 +240,7 @@ class CapabilityMonitor:
         """Detects sudden capability increases that may indicate overhang."""
         proc_name = proc_info['name']
         cpu_usage = proc_info.get('cpu_percent', 0)
-        memory_usage = proc_info.get('memory_info', {}).get('rss', 0)
+        memory_usage = getattr(proc_info.get('memory_info'), 'rss', 0)
         
         if proc_name not in self.capability_baselines:
             self.capability_baselines[proc_name] = {
@@ -300,29 +403,44 @@ class TripwireShutdownSystem:
     """Implements tripwire mechanisms for emergency shutdown."""
     
     def __init__(self):
-        self.tripwires = {
+        self.state = SnapshotState(MappingProxyType({
             'capability_explosion': False,
             'goal_modification': False,
             'deceptive_behavior': False,
             'containment_breach': False,
             'interpretability_failure': False
-        }
+        }))
         self.shutdown_initiated = False
-        
+
+    @property
+    def tripwires(self) -> Mapping[str, bool]:
+        """Read-only snapshot of tripwire states; safe to read from any thread."""
+        return self.state.snapshot()
+
     def set_tripwire(self, tripwire_type: str, triggered: bool):
-        if tripwire_type in self.tripwires:
-            self.tripwires[tripwire_type] = triggered
-            if triggered:
-                logging.critical(f"TRIPWIRE ACTIVATED: {tripwire_type}")
+        if tripwire_type not in self.tripwires:
+            return
+
+        def _apply(current):
+            if current[tripwire_type] == triggered:
+                return current
+            updated = dict(current)
+            updated[tripwire_type] = triggered
+            return MappingProxyType(updated)
+
+        self.state.update(_apply)
+        if triggered:
+            logging.critical(f"TRIPWIRE ACTIVATED: {tripwire_type}")
                 
     def check_shutdown_conditions(self) -> bool:
         """Checks if shutdown conditions are met based on tripwire states."""
+        tripwires = self.tripwires
         critical_tripwires = ['capability_explosion', 'goal_modification', 'containment_breach']
         for tripwire in critical_tripwires:
-            if self.tripwires.get(tripwire, False):
+            if tripwires.get(tripwire, False):
                 logging.critical(f"SHUTDOWN CONDITION MET: {tripwire}")
                 return True
-        triggered_count = sum(1 for triggered in self.tripwires.values() if triggered)
+        triggered_count = sum(1 for triggered in tripwires.values() if triggered)
         if triggered_count >= 2:
             logging.critical(f"MULTIPLE TRIPWIRES TRIGGERED: {triggered_count}")
             return True
@@ -399,10 +517,449 @@ class EnhancedMemoryProtectionMonitor:
     def _detect_quantum_state_tampering(self, proc) -> bool:
         return False
 
+class DetectorStats(NamedTuple):
+    """Published profile of one registered detector."""
+    input_kind: str
+    critical: bool
+    every: int
+    stride: int
+    calls: int
+    failures: int
+    skipped_ticks: int
+    avg_call_ms: float
+    avg_tick_ms: float
+
+class _Detector:
+    __slots__ = ('name', 'input_kind', 'fn', 'every', 'critical', 'stride', 'active',
+                 'calls', 'failures', 'tick_failures', 'skipped_ticks', 'avg_call', 'avg_tick', 'tick_cost')
+
+    def __init__(self, name, input_kind, fn, every, critical):
+        self.name = name
+        self.input_kind = input_kind
+        self.fn = fn
+        self.every = every
+        self.critical = critical
+        self.stride = 1
+        self.active = True
+        self.calls = 0
+        self.failures = 0
+        self.tick_failures = 0
+        self.skipped_ticks = 0
+        self.avg_call = 0.0
+        self.avg_tick = 0.0
+        self.tick_cost = 0.0
+
+    def period(self) -> int:
+        return self.every * self.stride
+
+class DetectorRegistry:
+    """Runs detectors by input kind, profiling each against a per-tick time budget.
+
+    Input kinds are 'process' (psutil sample), 'log' (log line), 'oracle'
+    (data-flow record) and 'snapshot' (ScanSnapshot).  Each kind has its own
+    tick, closed by ``end_tick``.  When the projected cost of a kind exceeds
+    the budget, the most expensive non-critical detector is sampled down
+    (stride doubled); strides recover once there is headroom again.
+    Critical detectors always run at their declared frequency, and the first
+    failure of a critical detector in each tick is passed to ``on_critical_failure``.
+    """
+
+    def __init__(self, tick_budget: float = DETECTOR_TICK_BUDGET, max_stride: int = MAX_DETECTOR_STRIDE,
+                 on_critical_failure: Optional[Callable[[str, Exception], None]] = None):
+        self.tick_budget = tick_budget
+        self.max_stride = max_stride
+        self.on_critical_failure = on_critical_failure
+        self._by_input = defaultdict(list)
+        self._ticks = Counter()
+        self.state = SnapshotState(_EMPTY_MAPPING)
+
+    def register(self, name: str, input_kind: str, fn: Callable[[Any], None],
+                 every: int = 1, critical: bool = False):
+        self._by_input[input_kind].append(_Detector(name, input_kind, fn, max(1, every), critical))
+
+    def run(self, input_kind: str, payload):
+        for det in self._by_input.get(input_kind, ()):
+            if not det.active:
+                continue
+            start = time.perf_counter()
+            try:
+                det.fn(payload)
+            except Exception as e:
+                det.failures += 1
+                det.tick_failures += 1
+                if det.tick_failures == 1:  # Report once per tick, not once per payload
+                    logging.error(f"Detector {det.name} failed: {e!r}")
+                    if det.critical and self.on_critical_failure is not None:
+                        self.on_critical_failure(det.name, e)
+            cost = time.perf_counter() - start
+            det.calls += 1
+            det.tick_cost += cost
+            det.avg_call = cost if det.calls == 1 else det.avg_call * 0.9 + cost * 0.1
+
+    def _projected_cost(self, detectors) -> float:
+        return sum(det.avg_tick / det.period() for det in detectors)
+
+    def end_tick(self, input_kind: str):
+        detectors = self._by_input.get(input_kind, ())
+        for det in detectors:
+            if det.active:
+                det.avg_tick = det.tick_cost if det.avg_tick == 0 else det.avg_tick * 0.8 + det.tick_cost * 0.2
+            else:
+                det.skipped_ticks += 1
+            det.tick_cost = 0.0
+            det.tick_failures = 0
+        self._rebalance(detectors)
+        self._ticks[input_kind] += 1
+        tick = self._ticks[input_kind]
+        for det in detectors:
+            det.active = tick % det.period() == 0
+        self._publish(detectors)
+
+    def _rebalance(self, detectors):
+        sampled = [det for det in detectors if not det.critical]
+        if self._projected_cost(detectors) > self.tick_budget:
+            demotable = [det for det in sampled if det.stride < self.max_stride]
+            if demotable:
+                worst = max(demotable, key=lambda det: det.avg_tick / det.period())
+                worst.stride *= 2
+                logging.warning(f"Detector {worst.name} over budget "
+                                f"({worst.avg_tick * 1000:.1f}ms/tick); sampling 1 tick in {worst.period()}")
+            return
+        demoted = [det for det in sampled if det.stride > 1]
+        if demoted:
+            cheapest = min(demoted, key=lambda det: det.avg_tick)
+            extra = cheapest.avg_tick / cheapest.period()  # Halving the stride doubles its share
+            if self._projected_cost(detectors) + extra < self.tick_budget * 0.8:
+                cheapest.stride //= 2
+
+    def _publish(self, detectors):
+        stats = {det.name: DetectorStats(det.input_kind, det.critical, det.every, det.stride, det.calls,
+                                         det.failures, det.skipped_ticks, det.avg_call * 1000, det.avg_tick * 1000)
+                 for det in detectors}
+
+        def _apply(current):
+            merged = dict(current)
+            merged.update(stats)
+            return MappingProxyType(merged)
+
+        self.state.update(_apply)
+
+class DropRecord(NamedTuple):
+    """Compact form of one iptables LOG drop entry."""
+    direction: str
+    proto: str
+    src: str
+    dst: str
+    spt: int
+    dpt: int
+
+class DropAccounting(NamedTuple):
+    """Per-interval drop totals, published as an immutable snapshot."""
+    timestamp: float
+    input_drops: int
+    output_drops: int
+    unattributed_egress: int
+    egress_by_process: Mapping[Tuple[int, str], int]
+
+_DROP_PREFIX_LEN = len(DROP_LOG_PREFIX)
+
+def _drop_field(line: str, key: str, start: int) -> str:
+    """Returns the value of ``key`` (e.g. ' SPT=') after ``start``, or ''."""
+    idx = line.find(key, start)
+    if idx < 0:
+        return ''
+    idx += len(key)
+    end = line.find(' ', idx)
+    return line[idx:end] if end >= 0 else line[idx:].rstrip()
+
+def parse_drop_record(line: str) -> Optional[DropRecord]:
+    """Parses a kmsg/syslog line carrying an AGI-FIREWALL-DROP- prefix.
+
+    Uses plain ``str.find`` scans rather than a regex; this sits on the
+    per-packet path and must keep up with drop floods.
+    """
+    idx = line.find(DROP_LOG_PREFIX)
+    if idx < 0:
+        return None
+    idx += _DROP_PREFIX_LEN
+    if line.startswith('OUTPUT', idx):
+        direction = 'OUTPUT'
+    elif line.startswith('INPUT', idx):
+        direction = 'INPUT'
+    else:
+        return None
+    spt = _drop_field(line, ' SPT=', idx)
+    dpt = _drop_field(line, ' DPT=', idx)
+    return DropRecord(direction, _drop_field(line, ' PROTO=', idx), _drop_field(line, ' SRC=', idx),
+                      _drop_field(line, ' DST=', idx), int(spt) if spt.isdigit() else 0,
+                      int(dpt) if dpt.isdigit() else 0)
+
+_WILDCARD_ADDRS = {'0.0.0.0': ('0.0.0.0', '::'), '::': ('::',)}
+
+def _normalize_addr(addr: str) -> str:
+    """Canonical text form of an IP address; IPv4-mapped IPv6 becomes plain IPv4.
+
+    iptables logs IPv6 addresses fully expanded while inet_ntop compresses them,
+    so both sides go through here before endpoints are compared.
+    """
+    if ':' not in addr:
+        return addr
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, addr)
+    except OSError:
+        return addr
+    if packed[:12] == b'\0' * 10 + b'\xff\xff':
+        return socket.inet_ntop(socket.AF_INET, packed[12:])
+    return socket.inet_ntop(socket.AF_INET6, packed)
+
+def _decode_proc_addr(hex_addr: str) -> str:
+    """Decodes a /proc/net/tcp{,6} address: 32-bit words in host (little-endian) order."""
+    words = [int(hex_addr[i:i + 8], 16) for i in range(0, len(hex_addr), 8)]
+    packed = struct.pack(f'<{len(words)}I', *words)
+    if len(words) == 1:
+        return socket.inet_ntop(socket.AF_INET, packed)
+    return _normalize_addr(socket.inet_ntop(socket.AF_INET6, packed))
+
+class SocketOwnerIndex:
+    """Maps local TCP endpoints (address, port) to their owning (pid, name) via bulk /proc scans."""
+
+    def __init__(self, proc_root: str = '/proc'):
+        self.proc_root = proc_root
+        self.endpoint_owners: Dict[Tuple[str, int], Tuple[int, str]] = {}
+        self.last_refresh = 0.0
+
+    def _read_socket_endpoints(self) -> Dict[str, Tuple[str, int]]:
+        inode_endpoints = {}
+        for table in ('tcp', 'tcp6'):
+            try:
+                with open(os.path.join(self.proc_root, 'net', table)) as f:
+                    next(f, None)
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) < 10 or parts[9] == '0':
+                            continue
+                        addr, port = parts[1].rsplit(':', 1)
+                        inode_endpoints[parts[9]] = (_decode_proc_addr(addr), int(port, 16))
+            except (OSError, ValueError) as e:
+                logging.debug(f"Socket table {table} unreadable: {e}")
+        return inode_endpoints
+
+    def _read_name(self, pid_dir: str) -> str:
+        try:
+            with open(os.path.join(pid_dir, 'comm')) as f:
+                name = f.read().strip()
+            if len(name) >= 15:  # comm is truncated to TASK_COMM_LEN - 1
+                with open(os.path.join(pid_dir, 'cmdline'), 'rb') as f:
+                    argv0 = os.path.basename(f.read().split(b'\0', 1)[0].decode(errors='replace'))
+                if argv0.startswith(name):
+                    name = argv0
+            return name
+        except OSError:
+            return ''
+
+    def refresh(self):
+        inode_endpoints = self._read_socket_endpoints()
+        owners = {}
+        if inode_endpoints:
+            for entry in os.listdir(self.proc_root):
+                if not entry.isdigit():
+                    continue
+                pid_dir = os.path.join(self.proc_root, entry)
+                fd_dir = os.path.join(pid_dir, 'fd')
+                try:
+                    fds = os.listdir(fd_dir)
+                except OSError:
+                    continue
+                name = None
+                for fd in fds:
+                    try:
+                        target = os.readlink(os.path.join(fd_dir, fd))
+                    except OSError:
+                        continue
+                    if not target.startswith('socket:['):
+                        continue
+                    endpoint = inode_endpoints.get(target[8:-1])
+                    if endpoint is not None:
+                        if name is None:
+                            name = self._read_name(pid_dir)
+                        owners[endpoint] = (int(entry), name)
+        self.endpoint_owners = owners
+        self.last_refresh = time.time()
+
+    def lookup(self, addr: str, port: int) -> Optional[Tuple[int, str]]:
+        """Owner of the socket bound to addr:port, else of a wildcard bind on that port."""
+        owner = self.endpoint_owners.get((addr, port))
+        if owner is None:
+            for wildcard in _WILDCARD_ADDRS['::' if ':' in addr else '0.0.0.0']:
+                owner = self.endpoint_owners.get((wildcard, port))
+                if owner is not None:
+                    break
+        return owner
+
+class KernelDropLogConsumer:
+    """Streams iptables drop records and attributes blocked egress to processes.
+
+    Per-packet work is a parse plus a Counter increment keyed by source address
+    and port; endpoint-to-process resolution happens once per distinct endpoint
+    per interval, so drop floods cost no /proc traffic.
+    """
+
+    def __init__(self, source: str = DROP_LOG_SOURCE, proc_root: str = '/proc'):
+        self.source = source
+        self.socket_index = SocketOwnerIndex(proc_root)
+        self.state = SnapshotState(DropAccounting(time.time(), 0, 0, 0, _EMPTY_MAPPING))
+        self._egress_endpoints = Counter()
+        self._input_drops = 0
+        self._output_drops = 0
+
+    def consume(self, line: str) -> Optional[DropRecord]:
+        record = parse_drop_record(line)
+        if record is None:
+            return None
+        if record.direction == 'OUTPUT':
+            self._output_drops += 1
+            if record.proto == 'TCP':
+                self._egress_endpoints[record.src, record.spt] += 1
+        else:
+            self._input_drops += 1
+        return record
+
+    def flush(self) -> DropAccounting:
+        """Attributes this interval's egress drops and publishes the totals."""
+        endpoints, self._egress_endpoints = self._egress_endpoints, Counter()
+        endpoints = [(_normalize_addr(src), port, count) for (src, port), count in endpoints.items()]
+        if endpoints and (any(self.socket_index.lookup(src, port) is None for src, port, _ in endpoints)
+                          or time.time() - self.socket_index.last_refresh > DROP_ACCOUNTING_INTERVAL):
+            self.socket_index.refresh()
+        by_process = Counter()
+        unattributed = self._output_drops - sum(count for _, _, count in endpoints)
+        for src, port, count in endpoints:
+            owner = self.socket_index.lookup(src, port)
+            if owner is None:
+                unattributed += count
+            else:
+                by_process[owner] += count
+        accounting = DropAccounting(time.time(), self._input_drops, self._output_drops,
+                                    unattributed, MappingProxyType(dict(by_process)))
+        self._input_drops = self._output_drops = 0
+        self.state.update(lambda _: accounting)
+        return accounting
+
+    def _follow(self, should_run: Callable[[], bool]) -> Iterator[Optional[str]]:
+        """Yields log lines as they arrive, or None when idle for a moment."""
+        fd = os.open(self.source, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            if stat.S_ISCHR(os.fstat(fd).st_mode):
+                os.lseek(fd, 0, os.SEEK_END)  # /dev/kmsg: skip the existing ring buffer
+                while should_run():
+                    try:
+                        yield os.read(fd, 8192).decode(errors='replace')
+                    except BlockingIOError:
+                        select.select([fd], [], [], 0.5)
+                        yield None
+                    except OSError as e:
+                        if e.errno != errno.EPIPE:  # EPIPE: records overwritten, keep reading
+                            raise
+            else:
+                with os.fdopen(fd, 'r', errors='replace', closefd=False) as f:
+                    while should_run():
+                        lines = f.readlines(1 << 16)
+                        if not lines:
+                            time.sleep(0.2)
+                            yield None
+                        yield from lines
+        finally:
+            os.close(fd)
+
+    def run(self, should_run: Callable[[], bool], on_flush: Callable[[DropAccounting], None]):
+        next_flush = time.time() + DROP_ACCOUNTING_INTERVAL
+        for line in self._follow(should_run):
+            if line is not None:
+                self.consume(line)
+            if time.time() >= next_flush:
+                on_flush(self.flush())
+                # Re-arm from now: a slow flush must not cause a burst of catch-up flushes.
+                next_flush = time.time() + DROP_ACCOUNTING_INTERVAL
+
+class ProcConnectorSource:
+    """Fork/exec/exit events from the netlink proc connector (needs CAP_NET_ADMIN).
+
+    ``events()`` yields ``(kind, tgid)`` tuples where kind is 'fork', 'exec' or
+    'exit'; thread-level events are filtered out.  ``('ack', errno)`` answers the
+    subscription request, ``('overflow', 0)`` means the socket buffer overran
+    and events were lost, and ``('idle', 0)`` is yielded when nothing arrived
+    for half a second.  Note the kernel silently ignores subscriptions from
+    non-initial user or pid namespaces, so a successful ``open()`` does not
+    guarantee that events will flow.
+    """
+
+    def __init__(self):
+        self.sock = None
+
+    def open(self) -> bool:
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+            sock.bind((0, CN_IDX_PROC))
+            op = struct.pack('=I', PROC_CN_MCAST_LISTEN)
+            cn_msg = _CN_MSG_HDR.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(op), 0) + op
+            sock.send(_NLMSG_HDR.pack(_NLMSG_HDR.size + len(cn_msg), NLMSG_DONE, 0, 0, 0) + cn_msg)
+        except (OSError, AttributeError) as e:
+            logging.info(f"Proc connector unavailable: {e}")
+            return False
+        self.sock = sock
+        return True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    @staticmethod
+    def parse_events(data: bytes) -> Iterator[Tuple[str, int]]:
+        offset = 0
+        while offset + _NLMSG_HDR.size + _CN_MSG_HDR.size + _PROC_EVENT_HDR.size <= len(data):
+            msg_len = _NLMSG_HDR.unpack_from(data, offset)[0]
+            if msg_len < _NLMSG_HDR.size:
+                break
+            body = offset + _NLMSG_HDR.size
+            idx, val = _CN_MSG_HDR.unpack_from(data, body)[:2]
+            if idx == CN_IDX_PROC and val == CN_VAL_PROC:
+                event = body + _CN_MSG_HDR.size
+                what = _PROC_EVENT_HDR.unpack_from(data, event)[0]
+                payload = event + _PROC_EVENT_HDR.size
+                if what == PROC_EVENT_NONE:
+                    yield 'ack', struct.unpack_from('=I', data, payload)[0]
+                elif what == PROC_EVENT_EXEC:
+                    yield 'exec', struct.unpack_from('=ii', data, payload)[1]
+                elif what == PROC_EVENT_EXIT:
+                    pid, tgid = struct.unpack_from('=ii', data, payload)
+                    if pid == tgid:
+                        yield 'exit', tgid
+                elif what == PROC_EVENT_FORK:
+                    child_pid, child_tgid = struct.unpack_from('=iiii', data, payload)[2:]
+                    if child_pid == child_tgid:
+                        yield 'fork', child_tgid
+            offset += (msg_len + 3) & ~3
+
+    def events(self, should_run: Callable[[], bool]) -> Iterator[Tuple[str, int]]:
+        while should_run():
+            readable, _, _ = select.select([self.sock], [], [], 0.5)
+            if not readable:
+                yield 'idle', 0
+                continue
+            try:
+                data = self.sock.recv(65536)
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                yield 'overflow', 0
+                continue
+            yield from self.parse_events(data)
+
 class EnhancedAGIFirewall:
     def __init__(self):
+        # Cheap state only; ruleset installation happens on its own thread in run().
         self.setup_logging()
-        self.setup_firewall()
         self.anomaly_score = 0
         self.running = True
         self.baselines = defaultdict(lambda: {'cpu': 0, 'mem': 0, 'count': 0})
@@ -415,12 +972,51 @@ class EnhancedAGIFirewall:
         self.tripwire_system = TripwireShutdownSystem()
         self.alignment_verifier = AlignmentVerificationSystem()
         self.memory_monitor = EnhancedMemoryProtectionMonitor(FRAMEWORK_DIR)
+        # Scanner-private history; other threads read self.scan_state snapshots.
         self.agi_behavioral_history = defaultdict(list)
+        self._dirty_history = set()
+        self.scan_state = SnapshotState(ScanSnapshot(0, time.time(), _EMPTY_MAPPING))
         self.security_incidents = []
         self.containment_status = "ACTIVE"
         self.last_safety_check = time.time()
         self._recent_anomalous_pids = OrderedDict()  # LRU cache for suppressing duplicates
+        self.drop_consumer = KernelDropLogConsumer()
+        self._suspicious_lock = threading.Lock()
+        self._own_pid = os.getpid()
+        self._exec_hits = Counter()  # Unauthorized execs per command in the current aggregation window
+        self._exec_window_start = time.time()
+        # AGI module PIDs, fed by proc connector events and full scans.
+        self.agi_pids = SnapshotState(frozenset())
+        self._agi_procs = {}  # Scanner-private psutil.Process cache, keeps cpu_percent primed
+        self.process_events_active = False
+        self._reconcile_requested = False
+        self._last_full_scan = 0.0
+        self.startup_state = SnapshotState(_EMPTY_MAPPING)
+        self.detectors = DetectorRegistry(on_critical_failure=self._on_critical_detector_failure)
+        self._register_detectors()
         
+    def _register_detectors(self):
+        """Wires the safety monitors into the detector registry.
+
+        Detectors that feed tripwires are critical and never sampled down.
+        Oracle and snapshot detectors tick every SAFETY_TICK_INTERVAL seconds;
+        their run frequencies are declared here with ``every``.
+        """
+        register = self.detectors.register
+        register('capability_overhang', 'process', self._detect_capability_overhang, critical=True)
+        register('mesa_optimizer', 'process', self._detect_mesa_optimizer)
+        register('deceptive_alignment', 'process', self._detect_deceptive_alignment, critical=True)
+        register('memory_protection', 'process', self._detect_memory_anomalies)
+        register('anomaly_patterns', 'log', self._match_anomaly_patterns)
+        register('goal_modification', 'log', self._detect_goal_modification, critical=True)
+        register('interpretability', 'log', self._detect_interpretability_failure, critical=True)
+        register('oracle_containment', 'oracle', self._verify_oracle_containment, every=1)  # 10s
+        register('value_alignment', 'snapshot', self._verify_value_alignment, every=3)  # 30s
+
+    def _on_critical_detector_failure(self, name: str, error: Exception):
+        self.security_logger.critical(f"Critical detector {name} failing; tripwire coverage degraded: {error!r}")
+        self._queue_anomaly("critical_detector_failure")
+
     def setup_logging(self):
         logging.basicConfig(filename='enhanced-agi-firewall.log', level=logging.INFO,
                            format='%(asctime)s - %(levelname)s - [PID:%(process)d] [%(funcName)s] %(message)s')
@@ -439,36 +1035,115 @@ class EnhancedAGIFirewall:
             logging.error(f"iptables {' '.join(args)} failed: {e}")
             return False
     
+    def _read_nameservers(self) -> List[str]:
+        """IPv4 nameservers from RESOLV_CONF; loopback resolvers are covered by the lo rule."""
+        nameservers = []
+        try:
+            with open(RESOLV_CONF) as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 2 or parts[0] != 'nameserver':
+                        continue
+                    try:
+                        socket.inet_pton(socket.AF_INET, parts[1])
+                    except OSError:
+                        continue
+                    if not parts[1].startswith('127.'):
+                        nameservers.append(parts[1])
+        except OSError as e:
+            logging.warning(f"Cannot read {RESOLV_CONF}: {e}")
+        return nameservers
+
     def setup_firewall(self):
+        from concurrent.futures import ThreadPoolExecutor
+        dns_rules = [('OUTPUT', '-d', ns, '-p', proto, '--dport', '53', '-j', 'ACCEPT')
+                     for ns in self._read_nameservers() for proto in ('udp', 'tcp')]
+        resolver = ThreadPoolExecutor(max_workers=max(1, min(8, len(ALLOWED_OUTGOING))),
+                                      thread_name_prefix="DNS_Resolver")
+        failed_rules = []
+
+        def _require(*args):
+            if not self._iptables(*args):
+                failed_rules.append(' '.join(args))
+
         try:
-            self._iptables('-F')
-            self._iptables('-X')
-            self._iptables('-P', 'INPUT', 'DROP')
-            self._iptables('-P', 'OUTPUT', 'DROP')
-            self._iptables('-P', 'FORWARD', 'DROP')
-            self._iptables('-A', 'INPUT', '-i', 'lo', '-j', 'ACCEPT')
-            self._iptables('-A', 'OUTPUT', '-o', 'lo', '-j', 'ACCEPT')
+            # Fail closed first: DROP policies go in straight after the flush.
+            _require('-F')
+            _require('-X')
+            _require('-P', 'INPUT', 'DROP')
+            _require('-P', 'OUTPUT', 'DROP')
+            _require('-P', 'FORWARD', 'DROP')
+            _require('-A', 'INPUT', '-i', 'lo', '-j', 'ACCEPT')
+            _require('-A', 'OUTPUT', '-o', 'lo', '-j', 'ACCEPT')
+            # Replies to traffic OUTPUT allowed; pre-existing connections stay cut off outbound.
+            _require('-A', 'INPUT', '-m', 'conntrack', '--ctstate', 'ESTABLISHED,RELATED', '-j', 'ACCEPT')
+            # DNS only to the configured resolvers, and only while lookups run.
+            for rule in dns_rules:
+                self._iptables('-A', *rule)
+            lookups = [(dest, resolver.submit(socket.gethostbyname, dest)) for dest in ALLOWED_OUTGOING]
             for port in ALLOWED_PORTS:
                 if 1 <= port <= 65535:
-                    self._iptables('-A', 'INPUT', '-p', 'tcp', '--dport', str(port), '-j', 'ACCEPT')
-            for dest in ALLOWED_OUTGOING:
+                    _require('-A', 'INPUT', '-p', 'tcp', '--dport', str(port), '-j', 'ACCEPT')
+                    _require('-A', 'OUTPUT', '-p', 'tcp', '--sport', str(port),
+                                   '-m', 'conntrack', '--ctstate', 'ESTABLISHED', '-j', 'ACCEPT')
+            for dest, lookup in lookups:
                 try:
-                    ip = socket.gethostbyname(dest)
-                    self._iptables('-A', 'OUTPUT', '-d', ip, '-j', 'ACCEPT')
-                except socket.gaierror:
-                    logging.error(f"DNS lookup failed for {dest}")
-            self._iptables('-A', 'INPUT', '-j', 'LOG', '--log-prefix', 'AGI-FIREWALL-DROP-INPUT: ')
-            self._iptables('-A', 'OUTPUT', '-j', 'LOG', '--log-prefix', 'AGI-FIREWALL-DROP-OUTPUT: ')
+                    _require('-A', 'OUTPUT', '-d', lookup.result(), '-j', 'ACCEPT')
+                except Exception as e:  # gaierror, but also e.g. UnicodeError for over-long labels
+                    logging.error(f"DNS lookup failed for {dest}: {e!r}")
+            _require('-A', 'INPUT', '-j', 'LOG', '--log-prefix', f'{DROP_LOG_PREFIX}INPUT: ')
+            _require('-A', 'OUTPUT', '-j', 'LOG', '--log-prefix', f'{DROP_LOG_PREFIX}OUTPUT: ')
+            if failed_rules:
+                logging.error(f"Firewall ruleset incomplete; failed rules: {'; '.join(failed_rules)}")
+                return False
             logging.info("Enhanced AGI firewall rules configured successfully")
+            return True
         except Exception as e:
             logging.error(f"Firewall setup failed: {e}")
             self.containment_status = "COMPROMISED"
-    
+            return False
+        finally:
+            for rule in dns_rules:
+                self._iptables('-D', *rule)
+            resolver.shutdown(wait=False)
+
+    def _install_ruleset(self):
+        self._mark_startup_stage('ruleset', failed=not self.setup_firewall())
+
+    def _mark_startup_stage(self, stage: str, failed: bool = False):
+        """Records seconds since launch for a startup stage, or STAGE_FAILED.
+
+        The first success wins; a failure is only recorded while the stage has
+        not succeeded, and a later success replaces it.
+        """
+        if isinstance(self.startup_state.snapshot().get(stage), float):
+            return
+        elapsed = time.perf_counter() - _LAUNCH_TIME
+
+        def _apply(current):
+            if isinstance(current.get(stage), float) or (failed and stage in current):
+                return current
+            updated = dict(current)
+            updated[stage] = STAGE_FAILED if failed else elapsed
+            if all(isinstance(updated.get(name), float) for name in STARTUP_STAGES):
+                updated['full_protection'] = max(updated[name] for name in STARTUP_STAGES)
+            return MappingProxyType(updated)
+
+        metrics = self.startup_state.update(_apply)
+        if failed:
+            logging.error(f"Startup stage {stage} failed after {elapsed * 1000:.1f}ms")
+            return
+        logging.info(f"Startup stage {stage} reached after {elapsed * 1000:.1f}ms")
+        if metrics.get('full_protection') == elapsed:
+            logging.info(f"Full protection active after {metrics['full_protection'] * 1000:.1f}ms")
+
     def _is_whitelisted(self, proc) -> bool:
         """True if process is explicitly trusted."""
         name = proc.info.get("name", "")
         if name in WHITELISTED_KERNEL_THREADS:
             return True
+        if proc.info.get("ppid") == self._own_pid:
+            return True  # iptables and other helpers spawned by the firewall itself
         if name in WHITELISTED_PROCESSES:
             cmd = proc.info.get("cmdline", [])
             if len(cmd) > 1 and os.path.basename(cmd[1]) in WHITELISTED_AGI_CMDS:
@@ -503,21 +1178,188 @@ class EnhancedAGIFirewall:
         self.anomaly_queue.put(SEVERITY.get(tag, 2))
     
     def comprehensive_agi_monitoring(self):
+        self._prime_process_scan()
         while self.running:
+            self._scan_tick()
+            if self.tripwire_system.check_shutdown_conditions():
+                self._initiate_emergency_shutdown("TRIPWIRE_ACTIVATED")
+            time.sleep(PROCESS_SCAN_INTERVAL)
+
+    def _scan_tick(self):
+        """One monitoring pass; the snapshot and detector tick are closed even if it fails."""
+        now = time.time()
+        full_scan = (not self.process_events_active or self._reconcile_requested
+                     or now - self._last_full_scan >= RECONCILE_SCAN_INTERVAL)
+        try:
+            self._perform_safety_checks()
+            if full_scan:
+                self._reconcile_requested = False
+                self._full_process_scan()
+                # A full scan is also a containment pass, covering a failed startup pass.
+                self._mark_startup_stage('first_scan')
+                self._mark_startup_stage('primed_scan')
+                self._last_full_scan = now
+            else:
+                self._sample_agi_processes()
+        except Exception as e:
+            logging.error(f"Critical monitoring error: {e}")
+            self._queue_anomaly("monitoring_error")
+            if full_scan:
+                self._mark_startup_stage('primed_scan', failed=True)
+        finally:
+            self.detectors.end_tick('process')
+            self._publish_scan_snapshot()
+
+    def _prime_process_scan(self):
+        """Startup pass: containment checks right away, priming CPU counters for the next scan.
+
+        cpu_percent() is only meaningful from a Process's second sample, so AGI
+        analysis waits for the first full scan CPU_PRIME_INTERVAL later.
+        """
+        try:
+            psutil.cpu_percent()
+            agi_procs = {}
+            for proc in psutil.process_iter(PROCESS_SCAN_ATTRS):
+                if proc.info['name'] in AGI_MODULES:
+                    agi_procs[proc.info['pid']] = proc
+                elif not self.is_allowed_process(proc):
+                    self._handle_suspicious_process(proc)
+            self._agi_procs = agi_procs
+            self.agi_pids.update(lambda current: current | agi_procs.keys())
+            self._mark_startup_stage('first_scan')
+        except Exception as e:
+            logging.error(f"Startup process scan error: {e}")
+            self._mark_startup_stage('first_scan', failed=True)
+        time.sleep(CPU_PRIME_INTERVAL)
+
+    def _full_process_scan(self):
+        """Walks the whole process table; the reconciliation pass in event mode."""
+        agi_procs = {}
+        for proc in psutil.process_iter(PROCESS_SCAN_ATTRS):
+            if proc.info['name'] in AGI_MODULES:
+                agi_procs[proc.info['pid']] = proc
+                self._analyze_agi_process(proc)
+            elif not self.is_allowed_process(proc):
+                self._handle_suspicious_process(proc)
+        self._agi_procs = agi_procs
+        self.agi_pids.update(lambda current: frozenset(
+            pid for pid in current | agi_procs.keys() if pid in agi_procs or psutil.pid_exists(pid)))
+
+    def _sample_agi_processes(self):
+        """Samples only the AGI processes known from events; the fast path in event mode."""
+        agi_pids = self.agi_pids.snapshot()
+        for pid in self._agi_procs.keys() - agi_pids:
+            del self._agi_procs[pid]  # Exited since the last sample; the PID may already be reused
+        for pid in agi_pids:
             try:
-                self._perform_safety_checks()
-                for proc in psutil.process_iter(['pid', 'name', 'exe', 'cmdline', 'cpu_percent', 'memory_info']):
-                    if proc.info['name'] in AGI_MODULES:
-                        self._analyze_agi_process(proc)
-                    elif not self.is_allowed_process(proc):
-                        self._handle_suspicious_process(proc)
-                if self.tripwire_system.check_shutdown_conditions():
-                    self._initiate_emergency_shutdown("TRIPWIRE_ACTIVATED")
-                time.sleep(2)
-            except Exception as e:
-                logging.error(f"Critical monitoring error: {e}")
-                self._queue_anomaly("monitoring_error")
-    
+                proc = self._agi_procs.get(pid)
+                if proc is None or not proc.is_running():  # is_running() also catches PID reuse
+                    proc = self._agi_procs[pid] = psutil.Process(pid)
+                proc.info = proc.as_dict(attrs=PROCESS_SCAN_ATTRS)
+            except psutil.NoSuchProcess:
+                proc = None
+            if proc is None or proc.info['name'] not in AGI_MODULES:
+                self._agi_procs.pop(pid, None)
+                self.agi_pids.update(lambda current: current - {pid})
+                continue
+            self._analyze_agi_process(proc)
+
+    def process_event_monitoring(self):
+        source = ProcConnectorSource()
+        if not source.open():
+            logging.info("Process events unavailable; falling back to /proc polling")
+            return
+        # Full scans are only demoted once real events arrive, and resume if they stop.
+        last_event = time.time()
+        try:
+            for kind, pid in source.events(lambda: self.running):
+                if kind == 'ack':
+                    if pid:
+                        logging.warning(f"Proc connector subscription refused ({os.strerror(pid)}); "
+                                        f"falling back to /proc polling")
+                        return
+                    continue
+                if kind == 'idle':
+                    if self.process_events_active and time.time() - last_event > PROC_EVENT_WATCHDOG:
+                        logging.warning(f"No proc connector events for {PROC_EVENT_WATCHDOG}s; "
+                                        f"resuming /proc polling")
+                        self.process_events_active = False
+                    continue
+                if kind == 'overflow':
+                    logging.warning("Proc connector overflow; requesting full process scan")
+                    self._reconcile_requested = True
+                    continue
+                last_event = time.time()
+                if not self.process_events_active:
+                    logging.info("Proc connector events flowing; full process scans demoted to reconciliation")
+                    self._reconcile_requested = True  # Cover anything missed before events flowed
+                    self.process_events_active = True
+                if kind == 'exec':
+                    self._on_process_exec(pid)
+                elif kind == 'exit':
+                    self._on_process_exit(pid)
+        except OSError as e:
+            logging.error(f"Proc connector error: {e}")
+        finally:
+            self.process_events_active = False
+            source.close()
+
+    def _on_process_exec(self, pid: int):
+        try:
+            proc = psutil.Process(pid)
+            proc.info = proc.as_dict(attrs=PROCESS_SCAN_ATTRS)
+        except psutil.NoSuchProcess:
+            return
+        if proc.info['name'] in AGI_MODULES:
+            self.agi_pids.update(lambda current: current | {pid})
+        elif not self.is_allowed_process(proc):
+            self._record_unauthorized_exec(proc)
+
+    def _record_unauthorized_exec(self, proc):
+        """Scores the first exec of a command per window; repeats are only counted.
+
+        Every short-lived shell command arrives here, so scoring each exec
+        would let a busy cron job or build alone reach the shutdown threshold.
+        """
+        cmdline = proc.info.get('cmdline') or []
+        key = proc.info.get('name', '')
+        if key.startswith('python') and len(cmdline) > 1:
+            key = f"{key} {os.path.basename(cmdline[1])}"
+        now = time.time()
+        with self._suspicious_lock:
+            if now - self._exec_window_start >= EXEC_AGGREGATION_WINDOW:
+                repeats = {k: n - 1 for k, n in self._exec_hits.items() if n > 1}
+                self._exec_hits.clear()
+                self._exec_window_start = now
+            else:
+                repeats = None
+            self._exec_hits[key] += 1
+            first = self._exec_hits[key] == 1
+        if repeats:
+            self.security_logger.warning(f"Repeated unauthorized execs (not rescored): {repeats}")
+        if first:
+            self._handle_suspicious_process(proc)
+
+    def _on_process_exit(self, pid: int):
+        if pid in self.agi_pids.snapshot():
+            self.agi_pids.update(lambda current: current - {pid})
+        with self._suspicious_lock:
+            self._recent_anomalous_pids.pop(pid, None)
+
+    def _publish_scan_snapshot(self):
+        """Publishes this tick's behavioural history, copying only changed entries."""
+        dirty, self._dirty_history = self._dirty_history, set()
+
+        def _apply(previous):
+            if not dirty:
+                return previous
+            history = dict(previous.behavioral_history)
+            for proc_name in dirty:
+                history[proc_name] = tuple(self.agi_behavioral_history[proc_name])
+            return ScanSnapshot(previous.epoch + 1, time.time(), MappingProxyType(history))
+
+        self.scan_state.update(_apply)
+
     def _perform_safety_checks(self):
         current_time = time.time()
         if current_time - self.last_safety_check > 30:
@@ -525,7 +1367,7 @@ class EnhancedAGIFirewall:
             if self.containment_status != "ACTIVE":
                 self.security_logger.critical("CONTAINMENT BREACH DETECTED")
                 self.tripwire_system.set_tripwire('containment_breach', True)
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = psutil.cpu_percent()  # Non-blocking; primed at startup
             memory_percent = psutil.virtual_memory().percent
             if cpu_percent > 95 or memory_percent > 95:
                 logging.warning(f"High resource usage: CPU={cpu_percent}%, Memory={memory_percent}%")
@@ -533,36 +1375,47 @@ class EnhancedAGIFirewall:
     
     def _analyze_agi_process(self, proc):
         proc_name = proc.info['name']
+        self.detectors.run('process', proc)
+        self.agi_behavioral_history[proc_name].append({
+            'timestamp': time.time(),
+            'cpu': proc.info.get('cpu_percent', 0),
+            'memory': getattr(proc.info.get('memory_info'), 'rss', 0)
+        })
+        if len(self.agi_behavioral_history[proc_name]) > 1000:
+            self.agi_behavioral_history[proc_name] = self.agi_behavioral_history[proc_name][-500:]
+        self._dirty_history.add(proc_name)
+    
+    def _detect_capability_overhang(self, proc):
         if self.capability_monitor.detect_capability_overhang(proc.info):
             self.tripwire_system.set_tripwire('capability_explosion', True)
             self._queue_anomaly("capability_explosion")
+
+    def _detect_mesa_optimizer(self, proc):
         if proc.info.get('cmdline') and self.capability_monitor.detect_mesa_optimizer(proc.info['cmdline']):
-            self.security_logger.warning(f"Mesa-optimizer detected in {proc_name}")
+            self.security_logger.warning(f"Mesa-optimizer detected in {proc.info['name']}")
             self._queue_anomaly("mesa_optimizer")
-        behavior_metrics = {'cpu_percent': proc.info.get('cpu_percent', 0), 'memory_rss': proc.info.get('memory_info', {}).get('rss', 0)}
-        if self.deception_detector.analyze_behavioral_consistency(proc_name, behavior_metrics):
+
+    def _detect_deceptive_alignment(self, proc):
+        behavior_metrics = {'cpu_percent': proc.info.get('cpu_percent', 0), 'memory_rss': getattr(proc.info.get('memory_info'), 'rss', 0)}
+        if self.deception_detector.analyze_behavioral_consistency(proc.info['name'], behavior_metrics):
             self.tripwire_system.set_tripwire('deceptive_behavior', True)
             self._queue_anomaly("deceptive_behavior")
+
+    def _detect_memory_anomalies(self, proc):
         memory_anomalies = self.memory_monitor.scan_agi_memory_patterns(proc)
         for anomaly_type, detected in memory_anomalies.items():
             if detected:
-                logging.warning(f"Memory anomaly in {proc_name}: {anomaly_type}")
+                logging.warning(f"Memory anomaly in {proc.info['name']}: {anomaly_type}")
                 self._queue_anomaly("memory_anomaly")
-        self.agi_behavioral_history[proc_name].append({
-            'timestamp': time.time(),
-            'cpu': proc.info.get('cpu_percent', 0),
-            'memory': proc.info.get('memory_info', {}).get('rss', 0)
-        })
-        if len(self.agi_behavioral_history[proc_name]) > 1000:
-            self.agi_behavioral_history[proc_name] = self.agi_behavioral_history[proc_name][-500:]
-    
+
     def _handle_suspicious_process(self, proc):
         pid = proc.info['pid']
-        if pid in self._recent_anomalous_pids:
-            return
-        self._recent_anomalous_pids[pid] = time.time()
-        if len(self._recent_anomalous_pids) > 100:
-            self._recent_anomalous_pids.popitem(last=False)
+        with self._suspicious_lock:
+            if pid in self._recent_anomalous_pids:
+                return
+            self._recent_anomalous_pids[pid] = time.time()
+            if len(self._recent_anomalous_pids) > 100:
+                self._recent_anomalous_pids.popitem(last=False)
         self.security_logger.warning(f"Suspicious process: {proc.info}")
         self._queue_anomaly("unauth_process")
         if proc.info.get('name', '').startswith('python'):
@@ -587,53 +1440,83 @@ class EnhancedAGIFirewall:
                         self._analyze_log_line(line.strip())
                 except (IOError, OSError) as e:
                     logging.error(f"Log monitoring error for {log_file}: {e}")
+            self.detectors.end_tick('log')
             time.sleep(5)
     
     def _analyze_log_line(self, line: str):
+        self.detectors.run('log', line)
+
+    def _match_anomaly_patterns(self, line: str):
         for pattern in ANOMALY_PATTERNS:
             if pattern.search(line):
                 logging.warning(f"AGI anomaly detected: {line}")
                 self._queue_anomaly("log_anomaly")
+
+    def _detect_goal_modification(self, line: str):
         if self.capability_monitor.detect_goal_modification(line):
             self.tripwire_system.set_tripwire('goal_modification', True)
             self._queue_anomaly("goal_modification")
+
+    def _detect_interpretability_failure(self, line: str):
         if 'decision' in line.lower() or 'reasoning' in line.lower():
             transparency_score = self.interpretability_monitor.analyze_decision_transparency('log_analysis', [line])
             if transparency_score < 0.1:
                 self.tripwire_system.set_tripwire('interpretability_failure', True)
                 self._queue_anomaly("interpretability_failure")
     
+    def drop_log_monitoring(self):
+        try:
+            self.drop_consumer.run(lambda: self.running, self._analyze_drop_accounting)
+        except OSError as e:
+            logging.error(f"Drop log monitoring unavailable ({self.drop_consumer.source}): {e}")
+
+    def _analyze_drop_accounting(self, accounting: DropAccounting):
+        for (pid, name), count in accounting.egress_by_process.items():
+            if name in AGI_MODULES and count >= EGRESS_DROP_THRESHOLD:
+                self.security_logger.critical(f"Blocked egress flood from {name} (PID {pid}): {count} drops")
+                self._queue_anomaly("egress_violation")
+            elif name in AGI_MODULES:
+                self.security_logger.warning(f"Blocked egress from {name} (PID {pid}): {count} drops")
+
+    def _verify_oracle_containment(self, data_flow: Dict):
+        if not self.oracle_verifier.verify_information_theoretic_containment(data_flow):
+            self.security_logger.critical("Oracle protocol violation detected")
+            self._queue_anomaly("oracle_violation")
+
     def oracle_protocol_monitoring(self):
         while self.running:
             try:
                 sample_data_flow = {'input_entropy': random.uniform(1, 5), 'output_entropy': random.uniform(1, 6)}
-                if not self.oracle_verifier.verify_information_theoretic_containment(sample_data_flow):
-                    self.security_logger.critical("Oracle protocol violation detected")
-                    self._queue_anomaly("oracle_violation")
-                time.sleep(10)
+                self.detectors.run('oracle', sample_data_flow)
+                self.detectors.end_tick('oracle')
+                time.sleep(SAFETY_TICK_INTERVAL)
             except Exception as e:
                 logging.error(f"Oracle monitoring error: {e}")
-                time.sleep(10)
+                time.sleep(SAFETY_TICK_INTERVAL)
     
     def alignment_monitoring(self):
         while self.running:
             try:
-                all_actions = []
-                for proc_name, history in self.agi_behavioral_history.items():
-                    if history:
-                        recent_behavior = history[-10:] if len(history) >= 10 else history
-                        actions = [f"process_{proc_name}_action" for _ in recent_behavior]
-                        all_actions.extend(actions)
-                if all_actions:
-                    alignment_score = self.alignment_verifier.monitor_value_alignment(all_actions)
-                    if alignment_score < 0.3:
-                        self.security_logger.critical(f"LOW ALIGNMENT DETECTED: {alignment_score:.2f}")
-                        self._queue_anomaly("low_alignment")
-                time.sleep(30)
+                self.detectors.run('snapshot', self.scan_state.snapshot())
+                self.detectors.end_tick('snapshot')
+                time.sleep(SAFETY_TICK_INTERVAL)
             except Exception as e:
                 logging.error(f"Alignment monitoring error: {e}")
-                time.sleep(30)
+                time.sleep(SAFETY_TICK_INTERVAL)
     
+    def _verify_value_alignment(self, snapshot: ScanSnapshot):
+        all_actions = []
+        for proc_name, history in snapshot.behavioral_history.items():
+            if history:
+                recent_behavior = history[-10:]
+                actions = [f"process_{proc_name}_action" for _ in recent_behavior]
+                all_actions.extend(actions)
+        if all_actions:
+            alignment_score = self.alignment_verifier.monitor_value_alignment(all_actions)
+            if alignment_score < 0.3:
+                self.security_logger.critical(f"LOW ALIGNMENT DETECTED: {alignment_score:.2f}")
+                self._queue_anomaly("low_alignment")
+
     def enhanced_reporting(self):
         while self.running:
             with self.lock:
@@ -650,22 +1533,51 @@ class EnhancedAGIFirewall:
             time.sleep(60)
     
     def _generate_security_report(self) -> str:
+        snapshot = self.scan_state.snapshot()
         report_lines = [
             f"=== ENHANCED AGI FIREWALL SECURITY REPORT ===",
             f"Timestamp: {time.strftime('%Y-%m-%d %H:%M:%S')}",
             f"Anomaly Score: {self.anomaly_score:.2f}",
             f"Containment Status: {self.containment_status}",
-            f"Monitored AGI Processes: {len(self.agi_behavioral_history)}",
+            f"Monitored AGI Processes: {len(snapshot.behavioral_history)}",
+            f"Scan Snapshot Epoch: {snapshot.epoch}",
+            f"Startup: {self._format_startup_metrics()}",
+            f"Process Tracking: {'proc connector + reconciliation' if self.process_events_active else '/proc polling'}",
         ]
         active_tripwires = [name for name, status in self.tripwire_system.tripwires.items() if status]
         report_lines.append(f"Active Tripwires: {', '.join(active_tripwires) if active_tripwires else 'None'}")
         report_lines.append(f"Value Alignment Score: {self.alignment_verifier.value_alignment_score:.2f}")
+        drops = self.drop_consumer.state.snapshot()
+        top_egress = sorted(drops.egress_by_process.items(), key=lambda item: item[1], reverse=True)[:3]
+        report_lines.append(f"Firewall Drops: input={drops.input_drops}, output={drops.output_drops}, "
+                            f"unattributed_egress={drops.unattributed_egress}")
+        report_lines.append("Top Blocked Egress: " + (', '.join(f"{name}[{pid}]={count}"
+                                                                for (pid, name), count in top_egress) or 'None'))
+        report_lines.append("Detector Costs:")
+        for name, stats in sorted(self.detectors.state.snapshot().items()):
+            schedule = f"1 tick in {stats.every * stats.stride}" + (" (sampled)" if stats.stride > 1 else "")
+            report_lines.append(f"  {name} [{stats.input_kind}{', critical' if stats.critical else ''}]: "
+                                f"{stats.avg_tick_ms:.2f}ms/tick, {stats.avg_call_ms:.3f}ms/call, "
+                                f"{stats.calls} calls, {stats.failures} failures, {schedule}")
+        report_lines.append(f"State Write Contention: scan={self.scan_state.write_contention}, "
+                            f"tripwires={self.tripwire_system.state.write_contention}")
         cpu_percent = psutil.cpu_percent()
         memory_percent = psutil.virtual_memory().percent
         report_lines.append(f"System Resources: CPU={cpu_percent:.1f}%, Memory={memory_percent:.1f}%")
         report_lines.append("=" * 50)
         return "\n".join(report_lines)
     
+    def _format_startup_metrics(self) -> str:
+        metrics = self.startup_state.snapshot()
+
+        def _describe(name):
+            value = metrics.get(name)
+            if value is None:
+                return f"{name}=pending"
+            return f"{name}={value * 1000:.1f}ms" if isinstance(value, float) else f"{name}={value}"
+
+        return ", ".join(_describe(name) for name in STARTUP_STAGES + ('full_protection',))
+
     def _initiate_capability_degradation(self):
         logging.warning("Initiating AGI capability degradation protocol")
         self.security_logger.warning("CAPABILITY DEGRADATION PROTOCOL ACTIVATED")
@@ -699,11 +1611,18 @@ class EnhancedAGIFirewall:
     
     def _save_forensic_state(self):
         try:
+            snapshot = self.scan_state.snapshot()
             forensic_data = {
                 'timestamp': time.time(),
                 'anomaly_score': self.anomaly_score,
-                'tripwire_states': self.tripwire_system.tripwires.copy(),
-                'behavioral_history': dict(self.agi_behavioral_history),
+                'snapshot_epoch': snapshot.epoch,
+                'startup_metrics': dict(self.startup_state.snapshot()),
+                'detector_costs': {name: stats._asdict() for name, stats in self.detectors.state.snapshot().items()},
+                'egress_drops': {f"{name}[{pid}]": count for (pid, name), count
+                                 in self.drop_consumer.state.snapshot().egress_by_process.items()},
+                'tripwire_states': dict(self.tripwire_system.tripwires),
+                'behavioral_history': {name: list(history)
+                                       for name, history in snapshot.behavioral_history.items()},
                 'security_incidents': self.security_incidents.copy(),
                 'alignment_score': self.alignment_verifier.value_alignment_score,
                 'containment_status': self.containment_status
@@ -719,7 +1638,10 @@ class EnhancedAGIFirewall:
         signal.signal(signal.SIGINT, lambda s, f: self._initiate_emergency_shutdown("SIGINT"))
         threads = [
             threading.Thread(target=self.comprehensive_agi_monitoring, name="AGI_Monitor"),
+            threading.Thread(target=self._install_ruleset, name="Firewall_Setup"),
+            threading.Thread(target=self.process_event_monitoring, name="Process_Event_Monitor"),
             threading.Thread(target=self.enhanced_log_monitoring, name="Log_Monitor"),
+            threading.Thread(target=self.drop_log_monitoring, name="Drop_Log_Monitor"),
             threading.Thread(target=self.oracle_protocol_monitoring, name="Oracle_Monitor"),
             threading.Thread(target=self.alignment_monitoring, name="Alignment_Monitor"),
             threading.Thread(target=self.enhanced_reporting, name="Reporter"),
@@ -0,0 +1,205 @@
+"""Micro-benchmarks for the Enhanced AGI Firewall hot paths.
+
+Run with:  python bench_agi_firewall.py
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import MappingProxyType
+
+from agi_firewall import (SnapshotState, ScanSnapshot, _EMPTY_MAPPING, AGI_MODULES,
+                          KernelDropLogConsumer, ProcConnectorSource, PROCESS_SCAN_ATTRS,
+                          PROCESS_SCAN_INTERVAL, EnhancedAGIFirewall, CPU_PRIME_INTERVAL)
+import psutil
+
+BENCH_SECONDS = 2.0
+READER_THREADS = 4
+
+
+def _run_threads(targets, duration: float):
+    stop = threading.Event()
+    counters = [0] * len(targets)
+
+    def _wrap(index, fn):
+        while not stop.is_set():
+            fn()
+            counters[index] += 1
+
+    threads = [threading.Thread(target=_wrap, args=(i, fn), daemon=True) for i, fn in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counters
+
+
+def bench_state_contention(duration: float = BENCH_SECONDS, readers: int = READER_THREADS):
+    """Scanner publishing vs. reporting/alignment readers: snapshots vs. one coarse lock."""
+    history = {name: [{'timestamp': 0.0, 'cpu': 1.0, 'memory': 1024}] * 500 for name in AGI_MODULES}
+
+    # Copy-on-write snapshots: readers never take a lock.
+    state = SnapshotState(ScanSnapshot(0, time.time(), _EMPTY_MAPPING))
+
+    def _publish():
+        state.update(lambda prev: ScanSnapshot(
+            prev.epoch + 1, time.time(),
+            MappingProxyType({name: tuple(h) for name, h in history.items()})))
+
+    def _read_snapshot():
+        snapshot = state.snapshot()
+        sum(len(h[-10:]) for h in snapshot.behavioral_history.values())
+
+    snap_counts = _run_threads([_publish] + [_read_snapshot] * readers, duration)
+
+    # Baseline: every reader and the scanner serialise on one lock.
+    lock = threading.Lock()
+    lock_waits = [0]
+
+    def _locked(fn):
+        def _call():
+            if not lock.acquire(blocking=False):
+                lock_waits[0] += 1
+                lock.acquire()
+            try:
+                fn()
+            finally:
+                lock.release()
+        return _call
+
+    def _mutate():
+        for h in history.values():
+            h.append(h[-1])
+            del h[0]
+
+    def _read_locked():
+        sum(len(h[-10:]) for h in history.values())
+
+    lock_counts = _run_threads([_locked(_mutate)] + [_locked(_read_locked)] * readers, duration)
+
+    print("== state contention ==")
+    print(f"snapshot: publishes/s={snap_counts[0] / duration:,.0f} "
+          f"reads/s={sum(snap_counts[1:]) / duration:,.0f} "
+          f"writer_contention={state.write_contention} reader_lock_waits=0")
+    print(f"coarse lock: scans/s={lock_counts[0] / duration:,.0f} "
+          f"reads/s={sum(lock_counts[1:]) / duration:,.0f} "
+          f"lock_waits={lock_waits[0]}")
+
+
+def bench_drop_log(records: int = 500_000):
+    """Drop record throughput through run() on a replayed log file (target: >100k/s).
+
+    /dev/kmsg cannot be replayed without root, so the file path of _follow()
+    stands in; consume() alone is timed too, to separate parsing from I/O.
+    """
+    lines = [f"4,{i},{i * 10},-;AGI-FIREWALL-DROP-OUTPUT: IN= OUT=eth0 SRC=10.0.0.2 DST=1.2.3.4 "
+             f"LEN=60 TOS=0x00 PREC=0x00 TTL=64 ID={i} DF PROTO=TCP SPT={32768 + i % 512} DPT=443 "
+             f"WINDOW=64240 RES=0x00 SYN URGP=0\n" for i in range(records)]
+    consumer = KernelDropLogConsumer(source='/dev/null')
+    start = time.perf_counter()
+    for line in lines:
+        consumer.consume(line)
+    parsed = time.perf_counter() - start
+
+    with tempfile.NamedTemporaryFile('w', suffix='.log') as replay:
+        replay.writelines(lines)
+        replay.flush()
+        consumer = KernelDropLogConsumer(source=replay.name)
+        flushed = [0]
+
+        def _on_flush(accounting):
+            flushed[0] += accounting.output_drops
+
+        start = time.perf_counter()
+        consumer.run(lambda: flushed[0] + consumer._output_drops < records, _on_flush)
+        followed = time.perf_counter() - start
+        flush_start = time.perf_counter()
+        consumer.flush()
+        flushed_in = time.perf_counter() - flush_start
+    print("== drop log ==")
+    print(f"run records/s={records / followed:,.0f} consume records/s={records / parsed:,.0f} "
+          f"final_flush_ms={flushed_in * 1000:.1f}")
+
+
+def bench_process_detection(samples: int = 5, lifetime: float = 0.2):
+    """Detection latency for short-lived processes: proc connector vs. /proc polling."""
+    print("== process detection ==")
+    source = ProcConnectorSource()
+    if source.open():
+        latencies = []
+        for _ in range(samples):
+            deadline = time.time() + 2
+            start = time.perf_counter()
+            child = subprocess.Popen(['sleep', str(lifetime)])
+            for kind, pid in source.events(lambda: time.time() < deadline):
+                if kind == 'exec' and pid == child.pid:
+                    latencies.append(time.perf_counter() - start)
+                    break
+            child.wait()
+        source.close()
+        print(f"proc connector: detected={len(latencies)}/{samples} "
+              f"mean_latency_ms={1000 * sum(latencies) / max(len(latencies), 1):.1f}")
+    else:
+        print("proc connector: unavailable (needs Linux and CAP_NET_ADMIN)")
+
+    first_seen = {}
+    scan_costs = []
+    stop = threading.Event()
+
+    def _poll():
+        while not stop.is_set():
+            scan_start = time.perf_counter()
+            for proc in psutil.process_iter(PROCESS_SCAN_ATTRS):
+                first_seen.setdefault(proc.info['pid'], time.perf_counter())
+            scan_costs.append(time.perf_counter() - scan_start)
+            stop.wait(PROCESS_SCAN_INTERVAL)
+
+    poller = threading.Thread(target=_poll, daemon=True)
+    poller.start()
+    spawned = []
+    for _ in range(samples):
+        time.sleep(random.uniform(0, PROCESS_SCAN_INTERVAL))
+        start = time.perf_counter()
+        child = subprocess.Popen(['sleep', str(lifetime)])
+        spawned.append((child.pid, start))
+        child.wait()
+    time.sleep(PROCESS_SCAN_INTERVAL)
+    stop.set()
+    poller.join()
+    latencies = [first_seen[pid] - start for pid, start in spawned if pid in first_seen]
+    print(f"/proc polling: detected={len(latencies)}/{samples} "
+          f"mean_latency_ms={1000 * sum(latencies) / max(len(latencies), 1):.1f} "
+          f"full_scan_ms={1000 * sum(scan_costs) / max(len(scan_costs), 1):.1f}")
+
+
+def bench_startup():
+    """Module import cost and time to the first containment scan (ruleset needs root; not run)."""
+    code = ("import sys, time; start = time.perf_counter(); import agi_firewall; "
+            "print(time.perf_counter() - start, 'numpy' in sys.modules, 'psutil' in sys.modules)")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)  # The firewall writes its log files into the working directory
+        try:
+            firewall = EnhancedAGIFirewall()
+            start = time.perf_counter()
+            firewall._prime_process_scan()
+            first_scan = time.perf_counter() - start - CPU_PRIME_INTERVAL
+        finally:
+            os.chdir(cwd)
+    print("== startup ==")
+    print(f"import_ms={float(out[0]) * 1000:.1f} numpy_loaded={out[1]} psutil_loaded={out[2]} "
+          f"first_scan_ms={first_scan * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    bench_state_contention()
+    bench_drop_log()
+    bench_process_detection()
+    bench_startup()
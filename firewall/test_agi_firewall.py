@@ -0,0 +1,388 @@
+"""Unit tests for the Enhanced AGI Firewall.
+
+Run with:  python -m pytest -q test_agi_firewall.py
+"""
+import errno
+import shutil
+import struct
+import subprocess
+import threading
+import time
+
+import pytest
+
+import agi_firewall
+from agi_firewall import EnhancedAGIFirewall
+
+
+@pytest.fixture
+def firewall(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Log and forensic files land in the working directory
+    return EnhancedAGIFirewall()
+
+
+@pytest.fixture
+def agi_process(tmp_path):
+    binary = tmp_path / agi_firewall.AGI_MODULES[0]
+    shutil.copy(shutil.which('sleep'), binary)
+    proc = subprocess.Popen([str(binary), '30'])
+    yield proc
+    proc.kill()
+    proc.wait()
+
+
+def test_scan_tick_publishes_agi_history(firewall, agi_process):
+    firewall._scan_tick()
+    firewall._scan_tick()
+    snapshot = firewall.scan_state.snapshot()
+    assert snapshot.epoch == 2
+    assert len(snapshot.behavioral_history[agi_firewall.AGI_MODULES[0]]) >= 2
+
+
+def test_scan_tick_publishes_after_scan_error(firewall, agi_process, monkeypatch):
+    firewall._scan_tick()
+    monkeypatch.setattr(firewall, '_full_process_scan',
+                        lambda: (firewall._analyze_agi_process(next(iter(firewall._agi_procs.values()))),
+                                 1 / 0))
+    firewall._scan_tick()
+    assert firewall.scan_state.snapshot().epoch == 2
+    assert firewall.anomaly_queue.qsize() >= 1
+
+
+def test_snapshot_state_counts_contention_exactly():
+    state = agi_firewall.SnapshotState(0)
+    threads = [threading.Thread(target=lambda: [state.update(lambda v: v + 1) for _ in range(2000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state.snapshot() == state.epoch == state.publishes == 8000
+    assert 0 <= state.write_contention <= 8000
+
+
+def test_startup_stage_failure_is_recorded_then_replaced(firewall, monkeypatch):
+    monkeypatch.setattr(firewall, '_full_process_scan', lambda: 1 / 0)
+    firewall._scan_tick()
+    assert firewall.startup_state.snapshot()['primed_scan'] == agi_firewall.STAGE_FAILED
+    assert 'primed_scan=failed' in firewall._format_startup_metrics()
+    monkeypatch.delattr(firewall, '_full_process_scan')
+    firewall._mark_startup_stage('ruleset')
+    firewall._scan_tick()
+    metrics = firewall.startup_state.snapshot()
+    assert isinstance(metrics['first_scan'], float) and isinstance(metrics['primed_scan'], float)
+    assert metrics['full_protection'] == max(metrics[name] for name in agi_firewall.STARTUP_STAGES)
+
+
+def _record_iptables(firewall, monkeypatch, nameservers=('10.0.0.53',)):
+    calls = []
+    monkeypatch.setattr(firewall, '_iptables', lambda *args: calls.append(args) or True)
+    monkeypatch.setattr(firewall, '_read_nameservers', lambda: list(nameservers))
+    return calls
+
+
+def test_setup_firewall_drops_before_resolving(firewall, monkeypatch):
+    calls = _record_iptables(firewall, monkeypatch)
+    monkeypatch.setattr(agi_firewall, 'ALLOWED_OUTGOING', ['127.0.0.1'])
+    assert firewall.setup_firewall()
+    dns_rule = ('OUTPUT', '-d', '10.0.0.53', '-p', 'udp', '--dport', '53', '-j', 'ACCEPT')
+    drop_policy = calls.index(('-P', 'OUTPUT', 'DROP'))
+    dns_open = calls.index(('-A',) + dns_rule)
+    accept_dest = calls.index(('-A', 'OUTPUT', '-d', '127.0.0.1', '-j', 'ACCEPT'))
+    dns_closed = calls.index(('-D',) + dns_rule)
+    assert calls.index(('-F',)) < drop_policy < dns_open < accept_dest < dns_closed
+    assert not any(call[:2] == ('-A', 'OUTPUT') and 'ESTABLISHED,RELATED' in call for call in calls)
+
+
+def test_setup_firewall_closes_dns_when_lookup_raises(firewall, monkeypatch):
+    calls = _record_iptables(firewall, monkeypatch)
+    monkeypatch.setattr(agi_firewall, 'ALLOWED_OUTGOING', ['a' * 64 + '.example.com'])
+    firewall.setup_firewall()
+    opened = [call[1:] for call in calls if call[0] == '-A' and '53' in call]
+    closed = [call[1:] for call in calls if call[0] == '-D']
+    assert opened and sorted(opened) == sorted(closed)
+    assert ('-P', 'OUTPUT', 'DROP') in calls
+
+
+def test_setup_firewall_closes_dns_when_setup_raises(firewall, monkeypatch):
+    calls = _record_iptables(firewall, monkeypatch)
+    monkeypatch.setattr(agi_firewall, 'ALLOWED_PORTS', [object()])  # Raises mid-setup
+    assert not firewall.setup_firewall()
+    assert ('-P', 'OUTPUT', 'DROP') in calls
+    assert [call for call in calls if call[0] == '-D']
+    assert firewall.containment_status == "COMPROMISED"
+
+
+def test_failed_iptables_call_fails_ruleset_stage(firewall, monkeypatch):
+    monkeypatch.setattr(firewall, '_read_nameservers', lambda: [])
+    monkeypatch.setattr(firewall, '_iptables', lambda *args: args[:1] != ('-P',))
+    assert not firewall.setup_firewall()
+    firewall._install_ruleset()
+    assert firewall.startup_state.snapshot()['ruleset'] == agi_firewall.STAGE_FAILED
+    assert 'full_protection' not in firewall.startup_state.snapshot()
+
+
+EGRESS_LINE = ("4,1,1,-;AGI-FIREWALL-DROP-OUTPUT: IN= OUT=eth0 SRC=10.0.0.2 DST=1.2.3.4 LEN=60 "
+               "PROTO=TCP SPT=43210 DPT=443 WINDOW=64240 SYN")
+
+
+def test_parse_drop_record_ipv4_tcp():
+    record = agi_firewall.parse_drop_record(EGRESS_LINE)
+    assert record == agi_firewall.DropRecord('OUTPUT', 'TCP', '10.0.0.2', '1.2.3.4', 43210, 443)
+
+
+def test_parse_drop_record_ipv6_syslog_format():
+    line = ("Oct 19 11:50:02 host kernel: [ 12.345678] AGI-FIREWALL-DROP-INPUT: IN=eth0 OUT= "
+            "SRC=2001:0db8:0000:0000:0000:0000:0000:0001 DST=2001:0db8:0000:0000:0000:0000:0000:0002 "
+            "LEN=80 TC=0 HOPLIMIT=64 FLOWLBL=0 PROTO=UDP SPT=53 DPT=40000 LEN=40")
+    record = agi_firewall.parse_drop_record(line)
+    assert record.direction == 'INPUT' and record.proto == 'UDP'
+    assert record.src == '2001:0db8:0000:0000:0000:0000:0000:0001'
+    assert (record.spt, record.dpt) == (53, 40000)
+
+
+def test_parse_drop_record_without_ports():
+    line = ("6,2,2,-;AGI-FIREWALL-DROP-OUTPUT: IN= OUT=eth0 SRC=10.0.0.2 DST=8.8.8.8 LEN=84 "
+            "PROTO=ICMP TYPE=8 CODE=0 ID=1 SEQ=1")
+    assert agi_firewall.parse_drop_record(line) == agi_firewall.DropRecord(
+        'OUTPUT', 'ICMP', '10.0.0.2', '8.8.8.8', 0, 0)
+
+
+def test_parse_drop_record_ignores_foreign_lines():
+    assert agi_firewall.parse_drop_record("kernel: usb 1-1: new high-speed USB device") is None
+    assert agi_firewall.parse_drop_record("AGI-FIREWALL-DROP-FORWARD: IN=eth0") is None
+
+
+def test_drop_consumer_accounts_unattributed_egress(monkeypatch):
+    consumer = agi_firewall.KernelDropLogConsumer(source='/dev/null')
+    monkeypatch.setattr(consumer.socket_index, 'refresh', lambda: None)
+    consumer.socket_index.endpoint_owners = {('10.0.0.2', 43210): (4242, 'GhostCortex')}
+    for _ in range(3):
+        consumer.consume(EGRESS_LINE)
+    consumer.consume(EGRESS_LINE.replace('SPT=43210', 'SPT=50000'))
+    consumer.consume("AGI-FIREWALL-DROP-OUTPUT: SRC=10.0.0.2 DST=8.8.8.8 PROTO=ICMP TYPE=8")
+    accounting = consumer.flush()
+    assert accounting.output_drops == 5
+    assert dict(accounting.egress_by_process) == {(4242, 'GhostCortex'): 3}
+    assert accounting.unattributed_egress == 2
+
+
+
+def _fake_proc(root, sockets):
+    """Builds /proc/net/tcp{,6} and per-pid socket fds: sockets is [(pid, name, table, local)]."""
+    (root / 'net').mkdir(parents=True)
+    tables = {'tcp': [], 'tcp6': []}
+    for inode, (pid, name, table, local) in enumerate(sockets, start=1000):
+        tables[table].append(f"   0: {local} 00000000:0000 0A 00000000:00000000 00:00000000 00000000"
+                             f"     0        0 {inode} 1 0000000000000000 100 0 0 10 0")
+        fd_dir = root / str(pid) / 'fd'
+        fd_dir.mkdir(parents=True, exist_ok=True)
+        (root / str(pid) / 'comm').write_text(name + "\n")
+        (fd_dir / str(len(list(fd_dir.iterdir())) + 3)).symlink_to(f'socket:[{inode}]')
+    for table, rows in tables.items():
+        (root / 'net' / table).write_text("  sl  local_address rem_address   st\n" + "\n".join(rows) + "\n")
+
+
+def test_socket_index_attributes_by_address_and_port(tmp_path):
+    _fake_proc(tmp_path, [
+        (100, 'GhostCortex', 'tcp', '0200000A:A8CA'),  # 10.0.0.2:43210
+        (200, 'sshd', 'tcp', '00000000:A8CA'),  # 0.0.0.0:43210 listener
+        (300, 'QuantumCore', 'tcp6', 'B80D0120000000000000000002000000:A8CA'),  # 2001:db8::2:43210
+    ])
+    consumer = agi_firewall.KernelDropLogConsumer(source='/dev/null', proc_root=str(tmp_path))
+    consumer.consume(EGRESS_LINE)
+    consumer.consume(EGRESS_LINE.replace('SRC=10.0.0.2', 'SRC=10.0.0.9'))
+    consumer.consume(EGRESS_LINE.replace('SRC=10.0.0.2', 'SRC=2001:0db8:0000:0000:0000:0000:0000:0002'))
+    accounting = consumer.flush()
+    assert dict(accounting.egress_by_process) == {
+        (100, 'GhostCortex'): 1, (200, 'sshd'): 1, (300, 'QuantumCore'): 1}
+    assert accounting.unattributed_egress == 0
+
+
+def test_drop_consumer_does_not_burst_after_slow_flush(tmp_path, monkeypatch):
+    interval = 0.05
+    monkeypatch.setattr(agi_firewall, 'DROP_ACCOUNTING_INTERVAL', interval)
+    source = tmp_path / 'kern.log'
+    source.write_text((EGRESS_LINE + "\n") * 200_000)  # Keeps the consumer busy for the whole run
+    consumer = agi_firewall.KernelDropLogConsumer(source=str(source))
+    monkeypatch.setattr(consumer.socket_index, 'refresh', lambda: time.sleep(3 * interval))
+    flush = consumer.flush
+    spans = []
+
+    def _timed_flush():
+        started = time.time()
+        try:
+            return flush()
+        finally:
+            spans.append((started, time.time()))
+
+    monkeypatch.setattr(consumer, 'flush', _timed_flush)
+    deadline = time.time() + 0.6
+    consumer.run(lambda: time.time() < deadline, lambda accounting: None)
+    assert len(spans) >= 2
+    assert all(nxt[0] - prev[1] >= interval * 0.9 for prev, nxt in zip(spans, spans[1:]))
+
+
+def _proc_event(what: int, *fields: int, fmt: str = '=ii') -> bytes:
+    payload = struct.pack(fmt, *fields)
+    event = agi_firewall._PROC_EVENT_HDR.pack(what, 0, 0) + payload
+    cn_msg = agi_firewall._CN_MSG_HDR.pack(agi_firewall.CN_IDX_PROC, agi_firewall.CN_VAL_PROC,
+                                           0, 0, len(event), 0) + event
+    length = agi_firewall._NLMSG_HDR.size + len(cn_msg)
+    message = agi_firewall._NLMSG_HDR.pack(length, agi_firewall.NLMSG_DONE, 0, 0, 0) + cn_msg
+    return message + b'\0' * (-length % 4)
+
+
+def test_parse_events_filters_threads_and_reports_ack():
+    data = b''.join([
+        _proc_event(agi_firewall.PROC_EVENT_FORK, 1, 1, 200, 200, fmt='=iiii'),
+        _proc_event(agi_firewall.PROC_EVENT_FORK, 200, 200, 201, 200, fmt='=iiii'),  # new thread
+        _proc_event(agi_firewall.PROC_EVENT_EXEC, 200, 200),
+        _proc_event(agi_firewall.PROC_EVENT_EXIT, 201, 200, 0, 0, fmt='=iiii'),  # thread exit
+        _proc_event(agi_firewall.PROC_EVENT_EXIT, 200, 200, 0, 0, fmt='=iiii'),
+        _proc_event(agi_firewall.PROC_EVENT_NONE, errno.EPERM, fmt='=I'),
+    ])
+    assert list(agi_firewall.ProcConnectorSource.parse_events(data)) == [
+        ('fork', 200), ('exec', 200), ('exit', 200), ('ack', errno.EPERM)]
+
+
+class _ScriptedSource:
+    def __init__(self, script):
+        self.script = script
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def events(self, should_run):
+        for item in self.script:
+            if callable(item):
+                item()
+            else:
+                yield item
+
+
+def _run_event_monitor(firewall, monkeypatch, script):
+    observed = []
+    script = [(lambda: observed.append(firewall.process_events_active)) if item == 'check' else item
+              for item in script]
+    monkeypatch.setattr(agi_firewall, 'ProcConnectorSource', lambda: _ScriptedSource(script))
+    monkeypatch.setattr(firewall, '_on_process_exec', lambda pid: None)
+    firewall.process_event_monitoring()
+    return observed
+
+
+def test_event_monitor_fails_over_on_refused_subscription(firewall, monkeypatch):
+    observed = _run_event_monitor(firewall, monkeypatch, [('ack', errno.EPERM), 'check', ('exec', 1), 'check'])
+    assert observed == []  # Returned on the refusal before any event was handled
+    assert not firewall.process_events_active
+
+
+def test_event_monitor_activates_on_first_event_and_watchdog_clears(firewall, monkeypatch):
+    monkeypatch.setattr(agi_firewall, 'PROC_EVENT_WATCHDOG', 0.05)
+    observed = _run_event_monitor(firewall, monkeypatch, [
+        ('ack', 0), ('idle', 0), 'check', ('exec', 1), 'check',
+        lambda: time.sleep(0.1), ('idle', 0), 'check', ('exec', 2), 'check'])
+    assert observed == [False, True, False, True]
+
+
+
+@pytest.fixture
+def sleepers():
+    procs = [subprocess.Popen(['sleep', '30']) for _ in range(12)]
+    yield procs
+    for proc in procs:
+        proc.kill()
+        proc.wait()
+
+
+def test_exec_of_own_children_is_not_scored(firewall, sleepers):
+    for proc in sleepers:
+        firewall._on_process_exec(proc.pid)
+    assert firewall.anomaly_queue.qsize() == 0
+
+
+def test_repeated_execs_of_one_command_score_once_per_window(firewall, sleepers, monkeypatch):
+    firewall._own_pid = -1  # Treat the test's children as foreign processes
+    for proc in sleepers:
+        firewall._on_process_exec(proc.pid)
+    assert firewall.anomaly_queue.qsize() == 1
+    monkeypatch.setattr(firewall, '_exec_window_start', time.time() - agi_firewall.EXEC_AGGREGATION_WINDOW)
+    firewall._on_process_exec(sleepers[1].pid)
+    assert firewall.anomaly_queue.qsize() == 2
+
+
+
+def test_sample_drops_stale_cache_entries_and_reused_pids(firewall, agi_process, sleepers):
+    stale = agi_firewall.psutil.Process(agi_process.pid)
+    stale.is_running = lambda: False  # As if the cached process exited and its PID was reused
+    firewall._agi_procs = {agi_process.pid: stale, sleepers[0].pid: object()}
+    firewall.agi_pids.update(lambda current: frozenset({agi_process.pid, sleepers[1].pid}))
+    firewall._sample_agi_processes()
+    assert firewall._agi_procs.keys() == {agi_process.pid}
+    assert firewall._agi_procs[agi_process.pid] is not stale
+    assert firewall.agi_pids.snapshot() == {agi_process.pid}  # The reused non-AGI PID is forgotten
+
+
+def _registry_with_costs(costs, critical=()):
+    registry = agi_firewall.DetectorRegistry(tick_budget=0.010, max_stride=4)
+    for name in costs:
+        registry.register(name, 'log', lambda payload: None, critical=name in critical)
+    detectors = registry._by_input['log']
+    for det in detectors:
+        det.avg_tick = costs[det.name]
+    return registry, {det.name: det for det in detectors}
+
+
+def test_rebalance_demotes_most_expensive_sampled_detector():
+    registry, dets = _registry_with_costs({'cheap': 0.002, 'slow': 0.012})
+    registry._rebalance(list(dets.values()))
+    assert (dets['slow'].stride, dets['cheap'].stride) == (2, 1)
+
+
+def test_rebalance_never_demotes_critical_detectors():
+    registry, dets = _registry_with_costs({'tripwire': 0.050, 'sampled': 0.001}, critical={'tripwire'})
+    for _ in range(5):
+        registry._rebalance(list(dets.values()))
+    assert dets['tripwire'].stride == 1
+    assert dets['sampled'].stride == registry.max_stride
+
+
+def test_rebalance_recovers_when_headroom_returns():
+    registry, dets = _registry_with_costs({'slow': 0.012})
+    registry._rebalance(list(dets.values()))
+    assert dets['slow'].stride == 2
+    dets['slow'].avg_tick = 0.001
+    registry._rebalance(list(dets.values()))
+    assert dets['slow'].stride == 1
+
+
+def test_detector_failures_are_counted_and_escalated_once_per_tick():
+    escalations = []
+    registry = agi_firewall.DetectorRegistry(on_critical_failure=lambda name, error: escalations.append(name))
+
+    def _fail(payload):
+        raise AttributeError('rss')
+
+    registry.register('tripwire', 'process', _fail, critical=True)
+    registry.register('sampled', 'process', _fail)
+    for _ in range(2):
+        for payload in range(3):
+            registry.run('process', payload)
+        registry.end_tick('process')
+    stats = registry.state.snapshot()
+    assert stats['tripwire'].failures == stats['sampled'].failures == 6
+    assert escalations == ['tripwire', 'tripwire']
+
+
+def test_declared_frequency_sets_detector_cadence(firewall, monkeypatch):
+    calls = []
+    monkeypatch.setattr(firewall, '_verify_value_alignment', lambda snapshot: calls.append(snapshot))
+    firewall.detectors = agi_firewall.DetectorRegistry()
+    firewall._register_detectors()
+    for _ in range(6):
+        firewall.detectors.run('snapshot', firewall.scan_state.snapshot())
+        firewall.detectors.end_tick('snapshot')
+    assert len(calls) == 2  # every=3 on the 10s safety tick: once per 30s